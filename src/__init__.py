@@ -1,7 +1,19 @@
 """
 AI Screenplay Generator
 """
-from .workflow import ScreenplayWorkflow
+from dotenv import load_dotenv
+
+# Load environment variables once per process, before any module reads them
+load_dotenv()
 
 __version__ = "0.1.0"
 __all__ = ["ScreenplayWorkflow"]
+
+
+def __getattr__(name):
+    # Imported on first use, so `python -m src.agent` and the utils don't
+    # pull in (or double-import) the whole graph just by importing the package
+    if name == "ScreenplayWorkflow":
+        from .workflow import ScreenplayWorkflow
+        return ScreenplayWorkflow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,117 +2,272 @@
 LangGraph agent entry point for deployment.
 This file exports the compiled graph for the LangGraph server.
 """
+import contextlib
+import functools
+import hashlib
+import logging
+import os
+import uuid
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
 from langgraph.graph import StateGraph, END
-from dotenv import load_dotenv
-
-from src.state import ScreenplayState
-from src.agents.logline_agent import create_logline_agent
-from src.agents.outline_agent import create_outline_agent
-from src.agents.character_agent import create_character_agent
-from src.agents.scene_agent import create_scene_agent
-from src.agents.dialogue_agent import create_dialogue_agent
+from langgraph.cache.base import BaseCache
+from langgraph.cache.sqlite import SqliteCache
+from langgraph.types import CachePolicy
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+import aiosqlite
+import orjson
+
+from src.state import ScreenplayState, SceneBranchOutput
+from src.agents.llm import model_name
+from src.agents.logline_agent import CACHE_SETTINGS as LOGLINE_SETTINGS, create_logline_agent
+from src.agents.outline_agent import CACHE_SETTINGS as OUTLINE_SETTINGS, create_outline_agent
+from src.agents.character_agent import CACHE_SETTINGS as CHARACTER_SETTINGS, create_character_agent
+from src.agents.scene_agent import CACHE_SETTINGS as SCENE_SETTINGS, create_scene_agent
+from src.agents.dialogue_agent import CACHE_SETTINGS as DIALOGUE_SETTINGS, create_dialogue_agent
 from src.utils.formatter import ScreenplayFormatter
 from src.utils.image_generator import ImageGenerator
 from src.utils.pdf_exporter import ScreenplayPDFExporter
 
-# Load environment variables
-load_dotenv()
+# Named explicitly: under `python -m src.agent` __name__ is "__main__", which
+# would fall outside the "src" logger the CLI turns up to INFO
+logger = logging.getLogger("src.agent")
 
 # Initialize utilities
 formatter = ScreenplayFormatter()
 image_generator = ImageGenerator()
 pdf_exporter = ScreenplayPDFExporter()
 
-
-def format_screenplay(state: dict) -> dict:
-    """Format the screenplay text."""
-    scenes = state.get('scenes', [])
-    title = state.get('title', 'UNTITLED')
-    author = "AI Generated"
-
-    formatted_text = formatter.format_screenplay(title, author, scenes)
-
-    return {
-        "formatted_screenplay": formatted_text,
-        "author": author
-    }
-
-
-def generate_character_images(state: dict) -> dict:
+# State models that checkpoints are allowed to restore
+checkpoint_serde = JsonPlusSerializer(
+    allowed_msgpack_modules=[("src.state", "Character"), ("src.state", "Scene")]
+)
+
+# LLM node outputs are cached when NODE_CACHE_DB is set, so re-running an
+# unchanged idea skips the model calls (entries expire after a day). Only
+# nodes that return are cached, so with a cache the agents raise on model or
+# parse errors instead of returning their fallbacks; the checkpointer lets the
+# run resume
+NODE_CACHE_TTL = 24 * 60 * 60
+
+
+def cache_on(*fields: str, settings: Optional[dict] = None) -> CachePolicy:
+    """
+    Cache policy keyed on only the state fields a node reads.
+
+    The whole state would make a poor key: a re-run on a finished thread carries
+    the previous run's later outputs, and image paths are filled in concurrently.
+    The model name and the node's settings (prompt version, token caps) are part
+    of the key too, so changing either stops old results from being replayed.
+    """
+    def cache_key(state: dict) -> bytes:
+        values = [model_name(), settings]
+        for field in fields:
+            value = state.get(field)
+            if isinstance(value, list):
+                value = [item.model_dump(exclude={"image_path"}) for item in value]
+            values.append(value)
+        return orjson.dumps(values)
+
+    return CachePolicy(key_func=cache_key, ttl=NODE_CACHE_TTL)
+
+
+def output_prefix(config: RunnableConfig) -> str:
+    """
+    Filename prefix for one run's images and PDF, from its checkpoint thread.
+
+    Concurrent runs would otherwise collide on title- and name-based files
+    (two untitled_screenplay.pdf, two john.png). Resuming a thread keeps its
+    prefix; a run without a thread gets a random one.
+    """
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if thread_id is None:
+        return uuid.uuid4().hex[:12]
+    return hashlib.sha1(str(thread_id).encode()).hexdigest()[:12]
+
+
+def generate_character_images(state: dict, config: RunnableConfig) -> dict:
     """Generate images for main characters."""
     characters = state.get('characters', [])
-    updated_characters = []
+    tasks = [character for character in characters if character.image_prompt]
+
+    for character in tasks:
+        logger.info("🎨 Generating image for %s...", character.name)
 
-    for character in characters:
-        if character.image_prompt:
-            print(f"\n🎨 Generating image for {character.name}...")
-            image_path = image_generator.generate_character_image(
-                character.name,
-                character.image_prompt,
-                style="cinematic photorealistic"
-            )
-            character.image_path = image_path
+    # All requests go out concurrently; characters are updated in place
+    image_paths = image_generator.generate_character_images([
+        (character.name, character.image_prompt, "cinematic photorealistic")
+        for character in tasks
+    ], run_id=output_prefix(config))
 
-        updated_characters.append(character)
+    for character, image_path in zip(tasks, image_paths):
+        character.image_path = image_path
 
-    return {"characters": updated_characters}
+    return {"characters": characters}
 
 
-def export_to_pdf(state: dict) -> dict:
-    """Export screenplay to PDF."""
+def export_to_pdf(state: dict, config: RunnableConfig) -> dict:
+    """Format the screenplay text and export it to PDF."""
     title = state.get('title', 'UNTITLED')
-    author = state.get('author', 'AI Generated')
+    author = "AI Generated"
     characters = state.get('characters', [])
     scenes = state.get('scenes', [])
 
-    print(f"\n📄 Exporting to PDF...")
+    formatted_text = formatter.format_screenplay(title, author, scenes)
+
+    logger.info("📄 Exporting to PDF...")
 
     pdf_path = pdf_exporter.export_pdf(
         title=title,
         author=author,
         characters=characters,
-        scenes=scenes
+        scenes=scenes,
+        run_id=output_prefix(config)
     )
 
     # Calculate total pages
     total_pages = len(characters) + 2 + len(scenes)
 
     return {
+        "formatted_screenplay": formatted_text,
+        "author": author,
         "pdf_path": pdf_path,
         "total_pages": total_pages
     }
 
 
-# Build the workflow
-workflow = StateGraph(ScreenplayState)
-
-# Add nodes
-workflow.add_node("logline_agent", create_logline_agent)
-workflow.add_node("outline_agent", create_outline_agent)
-workflow.add_node("character_agent", create_character_agent)
-workflow.add_node("scene_agent", create_scene_agent)
-workflow.add_node("dialogue_agent", create_dialogue_agent)
-workflow.add_node("formatter", format_screenplay)
-workflow.add_node("image_generator", generate_character_images)
-workflow.add_node("pdf_exporter", export_to_pdf)
-
-# Define flow
-workflow.set_entry_point("logline_agent")
-workflow.add_edge("logline_agent", "outline_agent")
-workflow.add_edge("outline_agent", "character_agent")
-workflow.add_edge("character_agent", "scene_agent")
-workflow.add_edge("scene_agent", "dialogue_agent")
-workflow.add_edge("dialogue_agent", "formatter")
-workflow.add_edge("formatter", "image_generator")
-workflow.add_edge("image_generator", "pdf_exporter")
-workflow.add_edge("pdf_exporter", END)
+def build_workflow(cache: Optional[BaseCache] = None) -> StateGraph:
+    """Build the screenplay graph, with the node cache its scene subgraph should use."""
+    # Without a cache a failed request falls back to a placeholder and the run
+    # goes on; with one, the agents raise so the placeholder is never cached
+    agent_options = {"raise_on_error": cache is not None}
+
+    # Scenes and their dialogue are written by a subgraph that the main workflow
+    # runs as one node. As two top-level nodes, scene_agent would share a
+    # superstep with image_generator, and dialogue could not start until the
+    # images were done; as one node, the whole branch overlaps image generation.
+    # It only hands back scenes, since image_generator updates characters in the
+    # same step. Subgraphs don't inherit the parent's node cache, so it is passed in
+    scene_branch = StateGraph(ScreenplayState, output_schema=SceneBranchOutput)
+    scene_branch.add_node("scene_agent", functools.partial(create_scene_agent, **agent_options),
+                          cache_policy=cache_on("logline", "genre", "tone", "beat_sheet", "characters",
+                                               settings=SCENE_SETTINGS))
+    scene_branch.add_node("dialogue_agent", functools.partial(create_dialogue_agent, **agent_options),
+                          cache_policy=cache_on("genre", "tone", "characters", "scenes",
+                                               settings=DIALOGUE_SETTINGS))
+    scene_branch.set_entry_point("scene_agent")
+    scene_branch.add_edge("scene_agent", "dialogue_agent")
+    scene_branch.add_edge("dialogue_agent", END)
+    scene_writer = scene_branch.compile(cache=cache)
+
+    # Main workflow
+    workflow = StateGraph(ScreenplayState)
+
+    # Add nodes
+    workflow.add_node("logline_agent", functools.partial(create_logline_agent, **agent_options),
+                      cache_policy=cache_on("idea", settings=LOGLINE_SETTINGS))
+    workflow.add_node("outline_agent", functools.partial(create_outline_agent, **agent_options),
+                      cache_policy=cache_on("logline", "genre", "tone", settings=OUTLINE_SETTINGS))
+    workflow.add_node("character_agent", functools.partial(create_character_agent, **agent_options),
+                      cache_policy=cache_on("logline", "genre", "tone", "outline",
+                                           settings=CHARACTER_SETTINGS))
+    workflow.add_node("scene_writer", scene_writer)
+    workflow.add_node("image_generator", generate_character_images)
+    workflow.add_node("pdf_exporter", export_to_pdf)
+
+    # Define flow
+    workflow.set_entry_point("logline_agent")
+    workflow.add_edge("logline_agent", "outline_agent")
+    workflow.add_edge("outline_agent", "character_agent")
+
+    # Image generation only needs characters, so it runs alongside scene writing
+    workflow.add_edge("character_agent", "scene_writer")
+    workflow.add_edge("character_agent", "image_generator")
+
+    # PDF export (which also formats the text) waits for both branches
+    workflow.add_edge(["scene_writer", "image_generator"], "pdf_exporter")
+    workflow.add_edge("pdf_exporter", END)
+
+    return workflow
+
 
 # Export the compiled graph for LangGraph server
-graph = workflow.compile()
+# (the server supplies its own persistence, so no checkpointer here)
+graph = build_workflow().compile()
+
+
+def compile_workflow():
+    """
+    Compile the graph for local runs, with the node cache when NODE_CACHE_DB is set.
+
+    The result can be reused for any number of runs; checkpointed() binds a
+    checkpointer to it per run, since the SQLite connection belongs to the
+    event loop that opened it.
+    """
+    node_cache_db = os.getenv("NODE_CACHE_DB")
+    cache = SqliteCache(path=node_cache_db, serde=checkpoint_serde) if node_cache_db else None
+    return build_workflow(cache).compile(cache=cache)
+
+
+@contextlib.asynccontextmanager
+async def checkpointed(app, checkpoint_db: Optional[str] = None):
+    """
+    Yield a copy of a compiled graph with a SQLite checkpointer attached.
+
+    Attaching the checkpointer is a shallow copy, not a recompile. The
+    connection is only valid inside this block and on the current event loop;
+    concurrent runs inside it share the one connection.
+    """
+    checkpoint_db = checkpoint_db or os.getenv("CHECKPOINT_DB", "screenplay_checkpoints.db")
+
+    async with aiosqlite.connect(checkpoint_db) as conn:
+        yield app.copy(update={"checkpointer": AsyncSqliteSaver(conn, serde=checkpoint_serde)})
+
+
+async def resume_or_start(app, idea: str) -> dict:
+    """
+    Run one idea on a checkpointed graph.
+
+    Runs are keyed by a hash of the idea, so re-running an idea whose last
+    attempt failed resumes from the last completed node instead of starting over.
+    """
+    config = {"configurable": {"thread_id": hashlib.sha1(idea.encode()).hexdigest()}}
+
+    snapshot = await app.aget_state(config)
+    if snapshot.next:
+        logger.info("↻ Resuming unfinished run at: %s", ", ".join(snapshot.next))
+        return await app.ainvoke(None, config)
+
+    return await app.ainvoke({"idea": idea}, config)
+
+
+async def run_workflow(idea: str, checkpoint_db: Optional[str] = None, app=None) -> dict:
+    """
+    Run the workflow for one idea with SQLite checkpointing.
+
+    A failed run of the same idea resumes from its last completed node.
+    With NODE_CACHE_DB set, LLM node results are also reused across runs.
+
+    Args:
+        idea: Story idea
+        checkpoint_db: SQLite checkpoint file (defaults to CHECKPOINT_DB)
+        app: Graph from compile_workflow() to reuse (compiled here if omitted)
+    """
+    if app is None:
+        app = compile_workflow()
+
+    async with checkpointed(app, checkpoint_db) as checkpointed_app:
+        return await resume_or_start(checkpointed_app, idea)
 
 
 def main():
     """CLI entry point for running the screenplay generator."""
+    import asyncio
+    import logging.handlers
+    import queue
     import sys
     import time
 
@@ -122,6 +277,15 @@ def main():
         print("  python -m src.agent 'A retired detective returns for one last cold case'")
         sys.exit(1)
 
+    # Show this package's progress logs without turning on INFO for every library.
+    # Records go through a queue to one listener thread, so the image threads
+    # never block on the console
+    log_queue = queue.SimpleQueue()
+    log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    logging.basicConfig(format="%(message)s", handlers=[logging.handlers.QueueHandler(log_queue)])
+    logging.getLogger("src").setLevel(logging.INFO)
+    log_listener.start()
+
     idea = " ".join(sys.argv[1:])
     start_time = time.time()
 
@@ -131,9 +295,11 @@ def main():
     print(f"📝 Story Idea: {idea}\n")
     print("🤖 Starting screenplay generation workflow...\n")
 
-    # Run workflow
-    initial_state = {"idea": idea}
-    final_state = graph.invoke(initial_state)
+    # Run workflow (agent nodes are async, so drive the graph on an event loop)
+    try:
+        final_state = asyncio.run(run_workflow(idea))
+    finally:
+        log_listener.stop()
 
     # Calculate generation time
     generation_time = time.time() - start_time
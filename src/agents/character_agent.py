@@ -1,12 +1,25 @@
 """
 Character Agent: Develops detailed character profiles with visual descriptions.
 """
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
-from pydantic import BaseModel, Field
-import os
+from pydantic import BaseModel, Field, TypeAdapter
+import logging
 from typing import List
 from ..state import Character
+from .llm import get_structured_llm
+
+logger = logging.getLogger(__name__)
+
+_character_list_adapter = TypeAdapter(List[Character])
+
+
+# 2-3 full profiles with image prompts run to roughly 1-2k tokens
+MAX_OUTPUT_TOKENS = 4096
+
+# Node-cache key settings: bump PROMPT_VERSION whenever the prompt, schema or
+# temperature changes, so cached results from the old ones are not replayed
+PROMPT_VERSION = 1
+CACHE_SETTINGS = {"prompt_version": PROMPT_VERSION, "max_output_tokens": MAX_OUTPUT_TOKENS}
 
 
 class CharacterSchema(BaseModel):
@@ -24,18 +37,24 @@ class CharacterList(BaseModel):
     characters: List[CharacterSchema] = Field(description="List of 2-3 main characters")
 
 
-def create_character_agent(state: dict) -> dict:
+def _get_structured_llm(max_output_tokens: int):
+    """Client that answers with a CharacterList."""
+    return get_structured_llm(CharacterList, 0.7, max_output_tokens)
+
+
+async def create_character_agent(
+    state: dict,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    raise_on_error: bool = False
+) -> dict:
     """
     Generate detailed character profiles with visual descriptions for image generation.
-    """
-    llm = ChatAnthropic(
-        model=os.getenv("SCREENPLAY_MODEL", "claude-3-5-sonnet-20241022"),
-        temperature=0.7,
-        max_tokens=4096
-    )
 
-    # Use structured output with a wrapper class
-    structured_llm = llm.with_structured_output(CharacterList)
+    max_output_tokens caps the response length (and so the worst-case latency).
+    raise_on_error re-raises model and parse errors instead of returning the
+    fallback, so a node cache never stores it.
+    """
+    structured_llm = _get_structured_llm(max_output_tokens)
 
     system_prompt = """You are an expert character development consultant for screenplays.
 
@@ -70,19 +89,23 @@ Outline:
 Create detailed character profiles with visual descriptions for AI image generation."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=[
+            {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]),
         HumanMessage(content=user_prompt)
     ]
 
     try:
-        response = structured_llm.invoke(messages)
-        print(response)
-        print(f"Generated {len(response.characters)} characters")
+        response = await structured_llm.ainvoke(messages)
+        logger.debug("response: %r", response)
+        logger.info("Generated %d characters", len(response.characters))
 
         # Convert CharacterSchema objects to Character objects
-        characters = [Character(**char.dict()) for char in response.characters]
+        characters = _character_list_adapter.validate_python(response.characters, from_attributes=True)
         return {"characters": characters}
     except Exception as e:
-        print(f"Error in character generation: {e}")
+        if raise_on_error:
+            raise
+        logger.warning("Error in character generation: %s", e)
         # Return empty list as fallback
         return {"characters": []}
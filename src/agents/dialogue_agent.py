@@ -1,13 +1,32 @@
 """
 Dialogue Agent: Enhances scenes with natural, character-specific dialogue.
 """
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
-import os
-import json
+import logging
+import orjson
 from typing import List, Optional
 from ..state import Scene
+from ..utils.text import uppercase
+from .llm import get_structured_llm
+
+logger = logging.getLogger(__name__)
+
+
+# Output cap per scene; actual usage is logged after each request
+MAX_OUTPUT_TOKENS = 1024
+
+# Output cap for the single request that covers every scene at once
+ALL_SCENES_MAX_OUTPUT_TOKENS = 4096
+
+# Node-cache key settings: bump PROMPT_VERSION whenever the prompt, schema or
+# temperature changes, so cached results from the old ones are not replayed
+PROMPT_VERSION = 1
+CACHE_SETTINGS = {
+    "prompt_version": PROMPT_VERSION,
+    "max_output_tokens": MAX_OUTPUT_TOKENS,
+    "all_scenes_max_output_tokens": ALL_SCENES_MAX_OUTPUT_TOKENS
+}
 
 
 class DialogueItem(BaseModel):
@@ -22,35 +41,42 @@ class DialogueList(BaseModel):
     dialogue: List[DialogueItem] = Field(description="List of dialogue exchanges")
 
 
-def create_dialogue_agent(state: dict) -> dict:
-    """
-    Write or enhance dialogue for each scene.
-    """
-    llm = ChatAnthropic(
-        model=os.getenv("SCREENPLAY_MODEL", "claude-3-5-sonnet-20241022"),
-        temperature=0.8,  # Higher temperature for more creative dialogue
-        max_tokens=4096
-    )
+class SceneDialogue(BaseModel):
+    """Dialogue lines for one scene, keyed by its scene number."""
+    scene_number: int = Field(description="Scene number this dialogue belongs to")
+    dialogue: List[DialogueItem] = Field(description="List of dialogue exchanges")
 
-    # Use structured output for dialogue
-    structured_llm = llm.with_structured_output(DialogueList)
 
-    # Process each scene
-    enhanced_scenes = []
+class AllDialogue(BaseModel):
+    """Dialogue for every scene in the screenplay."""
+    scenes: List[SceneDialogue] = Field(description="One entry per scene")
+
+
+def _get_structured_llm(max_output_tokens: int):
+    """Client that answers with one scene's DialogueList."""
+    # Higher temperature for more creative dialogue
+    return get_structured_llm(DialogueList, 0.8, max_output_tokens, include_raw=True)
+
 
-    for scene in state.get('scenes', []):
-        # Get character info for this scene
-        characters_in_scene = set()
-        for dialogue in scene.dialogue:
-            characters_in_scene.add(dialogue.get('character', ''))
+def _get_all_scenes_structured_llm():
+    """Client for the single request that writes every scene's dialogue."""
+    return get_structured_llm(AllDialogue, 0.8, ALL_SCENES_MAX_OUTPUT_TOKENS, include_raw=True)
 
-        character_info = "\n".join([
-            f"- {char.name}: {char.description}"
-            for char in state.get('characters', [])
-            if char.name in characters_in_scene
-        ])
 
-        system_prompt = """You are an award-winning screenplay dialogue writer.
+async def create_dialogue_agent(
+    state: dict,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    raise_on_error: bool = False
+) -> dict:
+    """
+    Write or enhance dialogue for each scene.
+
+    max_output_tokens caps each per-scene response; the single all-scenes
+    request uses ALL_SCENES_MAX_OUTPUT_TOKENS. A scene whose request fails keeps
+    its original dialogue, unless raise_on_error is set (so a node cache never
+    stores the half-written result).
+    """
+    system_prompt = """You are an award-winning screenplay dialogue writer.
 
 Your task is to write natural, compelling dialogue that:
 - Reveals character personality
@@ -62,35 +88,139 @@ Your task is to write natural, compelling dialogue that:
 
 Keep dialogue concise - film is a visual medium. Show, don't tell."""
 
-        user_prompt = f"""Scene #{scene.scene_number}
-Heading: {scene.heading}
-Action: {scene.action}
+    # Story-wide context is the same for every scene, so it joins the system
+    # prompt in one cached block that stays byte-identical across requests
+    char_by_name = {char.name: char for char in state.get('characters', [])}
 
-Characters in this scene:
-{character_info}
+    roster = "\n".join([
+        f"- {char.name}: {char.description}"
+        for char in char_by_name.values()
+    ])
 
-Genre: {state['genre']}
+    story_context = f"""Genre: {state['genre']}
 Tone: {state['tone']}
 
+Characters:
+{roster}"""
+
+    system_message = SystemMessage(content=[
+        {
+            "type": "text",
+            "text": f"{system_prompt}\n\n{story_context}",
+            "cache_control": {"type": "ephemeral"}
+        }
+    ])
+
+    scenes = state.get('scenes', [])
+
+    # Describe each scene once; the same text feeds the all-scenes prompt and
+    # the per-scene fallback requests
+    scene_prompts = {}
+    cast_by_names = {}
+
+    for scene in scenes:
+        # Only the scene-specific content changes between requests
+        characters_in_scene = frozenset(
+            dialogue.get('character', '') for dialogue in scene.dialogue
+        )
+
+        # Scenes that share a cast reuse the same string
+        cast = cast_by_names.get(characters_in_scene)
+        if cast is None:
+            # Scene stores speakers uppercased; the character list may not be
+            cast = ", ".join([
+                name for name in char_by_name if uppercase(name) in characters_in_scene
+            ])
+            cast_by_names[characters_in_scene] = cast
+
+        scene_prompts[scene.scene_number] = f"""Scene #{scene.scene_number}
+Heading: {scene.heading}
+Action: {scene.action}
+
+Characters in this scene: {cast}
+
 Current dialogue (enhance or replace):
-{json.dumps(scene.dialogue, indent=2)}
+{orjson.dumps(scene.dialogue, option=orjson.OPT_INDENT_2).decode()}"""
 
-Write compelling, natural dialogue for this scene."""
+    # One request for every scene: a single round-trip, and the model sees the
+    # whole story for dialogue continuity
+    dialogue_by_scene = {}
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+    if scenes:
+        all_scenes_prompt = "\n\n---\n\n".join(scene_prompts.values())
+        all_scenes_prompt += "\n\nWrite compelling, natural dialogue for every scene above, one entry per scene number."
 
         try:
-            response = structured_llm.invoke(messages)
-            print(response)
-            # Convert DialogueItem objects to dicts
-            scene.dialogue = [item.dict() for item in response.dialogue]
+            result = await _get_all_scenes_structured_llm().ainvoke([
+                system_message,
+                HumanMessage(content=all_scenes_prompt)
+            ])
+            if result["parsing_error"] or result["parsed"] is None:
+                raise ValueError(f"Could not parse dialogue: {result['parsing_error']}")
+            response = result["parsed"]
+            logger.debug("response: %r", response)
+
+            output_tokens = result["raw"].response_metadata.get("usage", {}).get("output_tokens")
+            logger.info("All-scenes dialogue output tokens: %s/%s", output_tokens, ALL_SCENES_MAX_OUTPUT_TOKENS)
+
+            # A response that hit the cap may be missing its last scenes; let
+            # the per-scene requests redo the work rather than trust it
+            if output_tokens is None or output_tokens < ALL_SCENES_MAX_OUTPUT_TOKENS:
+                dialogue_by_scene = {
+                    item.scene_number: [line.model_dump() for line in item.dialogue]
+                    for item in response.scenes
+                }
         except Exception as e:
-            print(f"Error generating dialogue for scene {scene.scene_number}: {e}")
-            # Keep original dialogue if parsing fails
-            pass
+            logger.warning("Error generating dialogue for all scenes: %s", e)
+
+    # Fall back to one request per scene for anything the batched call missed
+    missing_scenes = [scene for scene in scenes if scene.scene_number not in dialogue_by_scene]
+
+    if missing_scenes:
+        logger.info("Generating dialogue per scene for %d scene(s)", len(missing_scenes))
+
+        # Each scene is an independent request, so dispatch them all at once
+        responses = await _get_structured_llm(max_output_tokens).abatch(
+            [
+                [
+                    system_message,
+                    HumanMessage(content=f"{scene_prompts[scene.scene_number]}\n\nWrite compelling, natural dialogue for this scene.")
+                ]
+                for scene in missing_scenes
+            ],
+            config={"max_concurrency": 8},
+            return_exceptions=True
+        )
+
+        failed_scenes = []
+
+        for scene, result in zip(missing_scenes, responses):
+            if isinstance(result, Exception):
+                logger.warning("Error generating dialogue for scene %s: %s", scene.scene_number, result)
+                # Keep original dialogue if the request fails
+                failed_scenes.append(scene.scene_number)
+            elif result["parsing_error"] or result["parsed"] is None:
+                logger.warning("Error parsing dialogue for scene %s: %s", scene.scene_number, result["parsing_error"])
+                # Keep original dialogue if parsing fails
+                failed_scenes.append(scene.scene_number)
+            else:
+                response = result["parsed"]
+                logger.debug("response: %r", response)
+
+                output_tokens = result["raw"].response_metadata.get("usage", {}).get("output_tokens")
+                logger.debug("Scene %s dialogue output tokens: %s/%s", scene.scene_number, output_tokens, max_output_tokens)
+
+                # Convert DialogueItem objects to dicts
+                dialogue_by_scene[scene.scene_number] = [item.model_dump() for item in response.dialogue]
+
+        if failed_scenes and raise_on_error:
+            raise RuntimeError(f"Could not generate dialogue for scene(s) {failed_scenes}")
+
+    enhanced_scenes = []
+
+    for scene in scenes:
+        if scene.scene_number in dialogue_by_scene:
+            scene.dialogue = dialogue_by_scene[scene.scene_number]
 
         enhanced_scenes.append(scene)
 
@@ -0,0 +1,38 @@
+"""
+Shared Claude clients for the agents.
+"""
+from langchain_anthropic import ChatAnthropic
+import functools
+import os
+
+
+def model_name() -> str:
+    """The Claude model the agents use (SCREENPLAY_MODEL, or Claude 3.5 Sonnet)."""
+    return os.getenv("SCREENPLAY_MODEL", "claude-3-5-sonnet-20241022")
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm(temperature: float, max_tokens: int) -> ChatAnthropic:
+    """
+    Return a ChatAnthropic client for these settings.
+
+    Clients are cached process-wide, so agents with equal settings share one
+    and its connection pool survives between runs.
+    """
+    return ChatAnthropic(
+        model=model_name(),
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_structured_llm(schema: type, temperature: float, max_tokens: int, include_raw: bool = False):
+    """
+    Return a client bound to a structured-output schema.
+
+    Binding builds the tool definition from the schema, so it is done once per
+    (schema, settings) rather than on every run. With include_raw the result is
+    {"raw", "parsed", "parsing_error"}, which keeps token usage available.
+    """
+    return get_llm(temperature, max_tokens).with_structured_output(schema, include_raw=include_raw)
@@ -1,10 +1,21 @@
 """
 Logline Agent: Creates compelling one-sentence logline from story idea.
 """
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
-import os
+import logging
+from .llm import get_structured_llm
+
+logger = logging.getLogger(__name__)
+
+
+# Title, logline, genre and tone fit in well under 200 tokens
+MAX_OUTPUT_TOKENS = 512
+
+# Node-cache key settings: bump PROMPT_VERSION whenever the prompt, schema or
+# temperature changes, so cached results from the old ones are not replayed
+PROMPT_VERSION = 1
+CACHE_SETTINGS = {"prompt_version": PROMPT_VERSION, "max_output_tokens": MAX_OUTPUT_TOKENS}
 
 
 class LoglineSchema(BaseModel):
@@ -15,7 +26,16 @@ class LoglineSchema(BaseModel):
     tone: str = Field(description="Tone (e.g., Dark, Humorous, Suspenseful, Heartwarming)")
 
 
-def create_logline_agent(state: dict) -> dict:
+def _get_structured_llm(max_output_tokens: int):
+    """Client that answers with a LoglineSchema."""
+    return get_structured_llm(LoglineSchema, 0.7, max_output_tokens)
+
+
+async def create_logline_agent(
+    state: dict,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    raise_on_error: bool = False
+) -> dict:
     """
     Generate a compelling logline from the story idea.
 
@@ -23,15 +43,12 @@ def create_logline_agent(state: dict) -> dict:
     - Protagonist
     - Inciting incident
     - Goal/Stakes
-    """
-    llm = ChatAnthropic(
-        model=os.getenv("SCREENPLAY_MODEL", "claude-3-5-sonnet-20241022"),
-        temperature=0.7,
-        max_tokens=1024
-    )
 
-    # Use structured output
-    structured_llm = llm.with_structured_output(LoglineSchema)
+    max_output_tokens caps the response length (and so the worst-case latency).
+    raise_on_error re-raises model and parse errors instead of returning the
+    fallback, so a node cache never stores it.
+    """
+    structured_llm = _get_structured_llm(max_output_tokens)
 
     system_prompt = """You are an expert screenplay consultant specializing in loglines and titles.
 
@@ -56,15 +73,17 @@ A great LOGLINE should:
 Create a compelling title and professional logline with genre and tone."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=[
+            {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]),
         HumanMessage(content=user_prompt)
     ]
 
     try:
-        response = structured_llm.invoke(messages)
-        print(response)
-        print(f"Title: {response.title}")
-        print(f"Logline: {response.logline[:100]}...")
+        response = await structured_llm.ainvoke(messages)
+        logger.debug("response: %r", response)
+        logger.info("Title: %s", response.title)
+        logger.info("Logline: %.100s...", response.logline)
 
         return {
             "title": response.title,
@@ -73,7 +92,9 @@ Create a compelling title and professional logline with genre and tone."""
             "tone": response.tone
         }
     except Exception as e:
-        print(f"Error in logline generation: {e}")
+        if raise_on_error:
+            raise
+        logger.warning("Error in logline generation: %s", e)
         return {
             "title": "Untitled",
             "logline": "A compelling story unfolds.",
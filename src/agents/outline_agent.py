@@ -1,10 +1,21 @@
 """
 Outline Agent: Creates 3-act structure and beat sheet using structured output.
 """
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
-import os
+import logging
+from .llm import get_structured_llm
+
+logger = logging.getLogger(__name__)
+
+
+# Outlines rarely run past 2k tokens; actual usage is logged after each call
+MAX_OUTPUT_TOKENS = 2048
+
+# Node-cache key settings: bump PROMPT_VERSION whenever the prompt, schema or
+# temperature changes, so cached results from the old ones are not replayed
+PROMPT_VERSION = 1
+CACHE_SETTINGS = {"prompt_version": PROMPT_VERSION, "max_output_tokens": MAX_OUTPUT_TOKENS}
 
 
 class ScreenplayStructure(BaseModel):
@@ -14,21 +25,26 @@ class ScreenplayStructure(BaseModel):
     estimated_page_count: int = Field(description="Estimated number of pages for the script")
 
 
-def create_outline_agent(state: dict) -> dict:
+def _get_structured_llm(max_output_tokens: int):
+    """Client that answers with a ScreenplayStructure."""
+    # include_raw keeps the AIMessage next to the parsed ScreenplayStructure for token telemetry
+    return get_structured_llm(ScreenplayStructure, 0.7, max_output_tokens, include_raw=True)
+
+
+async def create_outline_agent(
+    state: dict,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    raise_on_error: bool = False
+) -> dict:
     """
     Generate a 3-act structure outline and detailed beat sheet.
 
     Uses LangChain's structured output to ensure reliable JSON parsing.
+    max_output_tokens caps the response length (and so the worst-case latency).
+    raise_on_error re-raises model and parse errors instead of returning the
+    fallback, so a node cache never stores it.
     """
-    # Setup LLM with increased max_tokens for longer screenplay content
-    llm = ChatAnthropic(
-        model=os.getenv("SCREENPLAY_MODEL", "claude-3-5-sonnet-20241022"),
-        temperature=0.7,
-        max_tokens=8192
-    )
-
-    # Apply structured output - returns Pydantic object instead of raw string
-    structured_llm = llm.with_structured_output(ScreenplayStructure)
+    structured_llm = _get_structured_llm(max_output_tokens)
 
     system_prompt = """You are an expert screenplay story structure consultant.
 Your task is to create a detailed 3-act structure outline with beat sheet.
@@ -65,17 +81,25 @@ Tone: {state['tone']}
 Create a detailed 3-act outline and beat sheet for this screenplay."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=[
+            {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]),
         HumanMessage(content=user_prompt)
     ]
 
     try:
-        # Invoke the structured model - returns a ScreenplayStructure object
-        response = structured_llm.invoke(messages)
+        # Invoke the structured model - returns the raw message and a ScreenplayStructure object
+        result = await structured_llm.ainvoke(messages)
+        if result["parsing_error"] or result["parsed"] is None:
+            raise ValueError(f"Could not parse outline: {result['parsing_error']}")
+        response = result["parsed"]
+
+        output_tokens = result["raw"].response_metadata.get("usage", {}).get("output_tokens")
+        logger.info("Outline output tokens: %s/%s", output_tokens, max_output_tokens)
 
-        print(response)
+        logger.debug("response: %r", response)
 
-        print(f"Outline generated. Est pages: {response.estimated_page_count}")
+        logger.info("Outline generated. Est pages: %s", response.estimated_page_count)
 
         # Access data directly from the Pydantic object
         return {
@@ -84,7 +108,9 @@ Create a detailed 3-act outline and beat sheet for this screenplay."""
         }
 
     except Exception as e:
-        print(f"Error in outline generation: {e}")
+        if raise_on_error:
+            raise
+        logger.warning("Error in outline generation: %s", e)
         # Fallback handling
         return {
             "outline": "Error generating outline.",
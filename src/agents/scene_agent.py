@@ -1,12 +1,25 @@
 """
 Scene Agent: Breaks outline into individual screenplay scenes.
 """
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
-from pydantic import BaseModel, Field
-import os
+from pydantic import BaseModel, Field, TypeAdapter
+import logging
 from typing import List, Optional
 from ..state import Scene
+from .llm import get_structured_llm
+
+logger = logging.getLogger(__name__)
+
+_scene_list_adapter = TypeAdapter(List[Scene])
+
+
+# Output cap for the full scene list; actual usage is logged after each call
+MAX_OUTPUT_TOKENS = 4096
+
+# Node-cache key settings: bump PROMPT_VERSION whenever the prompt, schema or
+# temperature changes, so cached results from the old ones are not replayed
+PROMPT_VERSION = 1
+CACHE_SETTINGS = {"prompt_version": PROMPT_VERSION, "max_output_tokens": MAX_OUTPUT_TOKENS}
 
 
 class DialogueItem(BaseModel):
@@ -31,21 +44,26 @@ class SceneList(BaseModel):
     scenes: List[SceneSchema] = Field(description="List of 3-5 scenes")
 
 
-def create_scene_agent(state: dict) -> dict:
+def _get_structured_llm(max_output_tokens: int):
+    """Client that answers with a SceneList."""
+    return get_structured_llm(SceneList, 0.7, max_output_tokens, include_raw=True)
+
+
+async def create_scene_agent(
+    state: dict,
+    max_output_tokens: int = MAX_OUTPUT_TOKENS,
+    raise_on_error: bool = False
+) -> dict:
     """
     Break the outline into individual scenes with proper screenplay formatting.
-    """
-    llm = ChatAnthropic(
-        model=os.getenv("SCREENPLAY_MODEL", "claude-3-5-sonnet-20241022"),
-        temperature=0.7,
-        max_tokens=8192
-    )
 
-    # Use structured output with a wrapper class
-    structured_llm = llm.with_structured_output(SceneList)
+    max_output_tokens caps the response length (and so the worst-case latency).
+    raise_on_error re-raises model and parse errors instead of returning the
+    fallback, so a node cache never stores it.
+    """
+    structured_llm = _get_structured_llm(max_output_tokens)
 
     # Create character list for reference
-    character_names = [char.name for char in state.get('characters', [])]
     character_info = "\n".join([
         f"- {char.name}: {char.description}" for char in state.get('characters', [])
     ])
@@ -116,32 +134,27 @@ IMPORTANT:
 Include scene headings, action, and placeholder for dialogue (dialogue will be written in next step)."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=[
+            {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]),
         HumanMessage(content=user_prompt)
     ]
 
     try:
-        response = structured_llm.invoke(messages)
-        print(response)
-        print(f"Generated {len(response.scenes)} scenes")
-
-        # Convert SceneSchema objects to Scene objects
-        # LLM assigns both scene_number and episode_number
-        scenes = []
-        for scene_schema in response.scenes:
-            # Convert DialogueItem objects to dicts
-            dialogue_list = [item.dict() for item in scene_schema.dialogue]
-
-            # Use episode_number from LLM response
-            scene_dict = {
-                "scene_number": scene_schema.scene_number,
-                "episode_number": scene_schema.episode_number,  # From LLM
-                "heading": scene_schema.heading,
-                "action": scene_schema.action,
-                "dialogue": dialogue_list,
-                "transition": scene_schema.transition
-            }
-            scenes.append(Scene(**scene_dict))
+        result = await structured_llm.ainvoke(messages)
+        if result["parsing_error"] or result["parsed"] is None:
+            raise ValueError(f"Could not parse scenes: {result['parsing_error']}")
+        response = result["parsed"]
+        logger.debug("response: %r", response)
+
+        output_tokens = result["raw"].response_metadata.get("usage", {}).get("output_tokens")
+        logger.info("Scene output tokens: %s/%s", output_tokens, max_output_tokens)
+        logger.info("Generated %d scenes", len(response.scenes))
+
+        # Convert SceneSchema objects to Scene objects in one validation pass
+        # LLM assigns both scene_number and episode_number; the fields map 1:1
+        # and model_dump() turns DialogueItem objects into dicts on the way
+        scenes = _scene_list_adapter.validate_python(response.model_dump()["scenes"])
 
         # Show episode breakdown
         if scenes:
@@ -152,10 +165,10 @@ Include scene headings, action, and placeholder for dialogue (dialogue will be w
                     episodes[ep] = []
                 episodes[ep].append(scene.scene_number)
 
-            print(f"✓ Generated {len(scenes)} scenes across {len(episodes)} episodes")
+            logger.info("✓ Generated %d scenes across %d episodes", len(scenes), len(episodes))
             for ep_num in sorted(episodes.keys()):
                 scene_nums = episodes[ep_num]
-                print(f"  Episode {ep_num}: Scenes {scene_nums[0]}-{scene_nums[-1]} ({len(scene_nums)} scenes)")
+                logger.info("  Episode %s: Scenes %s-%s (%d scenes)", ep_num, scene_nums[0], scene_nums[-1], len(scene_nums))
 
             # Return max episode number (total episodes)
             max_episode = max(episodes.keys())
@@ -167,5 +180,7 @@ Include scene headings, action, and placeholder for dialogue (dialogue will be w
             "episode_number": max_episode  # Total number of episodes
         }
     except Exception as e:
-        print(f"Error in scene generation: {e}")
+        if raise_on_error:
+            raise
+        logger.warning("Error in scene generation: %s", e)
         return {"scenes": [], "episode_number": 1}
@@ -1,8 +1,9 @@
 """
 State management for the screenplay generation workflow.
 """
-from typing import TypedDict, List, Optional
-from pydantic import BaseModel
+from typing import TypedDict, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, field_validator
+from .utils.text import uppercase
 
 
 class Character(BaseModel):
@@ -18,6 +19,9 @@ class Character(BaseModel):
 
 class Scene(BaseModel):
     """Individual screenplay scene."""
+    # Re-validate on assignment so replaced dialogue is normalized too
+    model_config = ConfigDict(validate_assignment=True)
+
     scene_number: int
     episode_number: Optional[int] = 1  # Episode this scene belongs to
     heading: str  # e.g., "INT. DETECTIVE'S OFFICE - NIGHT"
@@ -25,6 +29,45 @@ class Scene(BaseModel):
     dialogue: List[dict]  # [{"character": "JOHN", "line": "...", "parenthetical": "(optional)"}]
     transition: Optional[str] = None  # e.g., "CUT TO:", "FADE OUT."
 
+    # Headings, transitions and speaker names are uppercased once here,
+    # so the formatter and PDF exporter can use them as-is
+
+    @field_validator("heading", "transition")
+    @classmethod
+    def _uppercase(cls, value: Optional[str]) -> Optional[str]:
+        return uppercase(value) if value else value
+
+    @field_validator("dialogue")
+    @classmethod
+    def _uppercase_speakers(cls, dialogue: List[dict]) -> List[dict]:
+        for dialogue_block in dialogue:
+            character = dialogue_block.get("character")
+            if character:
+                dialogue_block["character"] = uppercase(character)
+        return dialogue
+
+    @property
+    def dialogue_blocks(self) -> List[Tuple[str, Optional[str], str]]:
+        """
+        Speakable dialogue as (character, parenthetical, line) tuples.
+
+        Blocks without a character or line are dropped, speakers are uppercased
+        and parentheticals are wrapped in parentheses. Built from the current
+        dialogue on every access (so in-place edits show up); exporters read it
+        once per scene.
+        """
+        blocks = []
+        for dialogue_block in self.dialogue:
+            character = dialogue_block.get("character")
+            line = dialogue_block.get("line")
+            if not (character and line):
+                continue
+            parenthetical = dialogue_block.get("parenthetical")
+            if parenthetical and not parenthetical.startswith("("):
+                parenthetical = f"({parenthetical})"
+            blocks.append((uppercase(character), parenthetical, line))
+        return blocks
+
 
 class ScreenplayState(TypedDict):
     """State for the screenplay generation workflow."""
@@ -55,3 +98,9 @@ class ScreenplayState(TypedDict):
     # Metadata
     total_pages: Optional[int]
     generation_time: Optional[float]
+
+
+class SceneBranchOutput(TypedDict):
+    """Fields the scene-writing branch hands back to the main workflow."""
+    scenes: Optional[List[Scene]]
+    episode_number: Optional[int]
@@ -2,8 +2,10 @@
 Screenplay formatter - converts structured data to properly formatted screenplay text.
 Follows industry-standard formatting (Courier 12pt equivalent spacing).
 """
+import textwrap
 from typing import List
 from ..state import Scene, Character
+from .text import uppercase
 
 
 class ScreenplayFormatter:
@@ -17,6 +19,27 @@ class ScreenplayFormatter:
         self.character_margin = 20
         self.parenthetical_margin = 15
         self.transition_margin = 45
+        self.dialogue_width = 35  # Dialogue is narrower
+
+        # Padding and separators are built once rather than on every call
+        self._character_pad = " " * self.character_margin
+        self._parenthetical_pad = " " * self.parenthetical_margin
+        self._dialogue_pad = " " * self.dialogue_margin
+        self._transition_pad = " " * self.transition_margin
+        self._title_padding = "\n" * 20
+        self._page_break = "\n" + "=" * 60 + "\n\n"
+
+        # Word wrappers are reused for every action/dialogue block
+        self._action_wrapper = textwrap.TextWrapper(
+            width=self.page_width,
+            break_long_words=False,
+            break_on_hyphens=False
+        )
+        self._dialogue_wrapper = textwrap.TextWrapper(
+            width=self.dialogue_width,
+            break_long_words=False,
+            break_on_hyphens=False
+        )
 
     def format_title_page(self, title: str, author: str = "AI Generated") -> str:
         """
@@ -29,81 +52,53 @@ class ScreenplayFormatter:
 
             Author Name
         """
-        title_page = "\n" * 20  # Start lower on page
-        title_page += f"{title.upper()}\n\n\n"
-        title_page += "Written by\n\n"
-        title_page += f"{author}\n"
-        title_page += "\n" * 20
-        return title_page
+        return "".join([
+            self._title_padding,  # Start lower on page
+            f"{uppercase(title)}\n\n\n",
+            "Written by\n\n",
+            f"{author}\n",
+            self._title_padding,
+        ])
 
     def format_scene_heading(self, heading: str) -> str:
         """
         Format scene heading (slug line).
         Example: INT. DETECTIVE'S OFFICE - NIGHT
         """
-        return f"\n\n{heading.upper()}\n\n"
+        return f"\n\n{uppercase(heading)}\n\n"
 
     def format_action(self, action: str) -> str:
         """
         Format action/description.
         Wraps text to proper width.
         """
-        # Simple word wrap
-        words = action.split()
-        lines = []
-        current_line = ""
-
-        for word in words:
-            if len(current_line) + len(word) + 1 <= self.page_width:
-                current_line += word + " "
-            else:
-                lines.append(current_line.strip())
-                current_line = word + " "
-
-        if current_line:
-            lines.append(current_line.strip())
-
-        return "\n".join(lines) + "\n"
+        # Short single-line text comes out of the wrapper unchanged
+        if len(action) <= self.page_width and action.isprintable() and not action.endswith(" "):
+            return action + "\n"
+        return "\n".join(self._action_wrapper.wrap(action)) + "\n"
 
     def format_character_name(self, character: str) -> str:
         """
         Format character name (centered above dialogue).
         """
-        spaces = " " * self.character_margin
-        return f"\n{spaces}{character.upper()}\n"
+        return f"\n{self._character_pad}{uppercase(character)}\n"
 
     def format_parenthetical(self, parenthetical: str) -> str:
         """
         Format parenthetical (actor direction).
         Example: (whispers)
         """
-        spaces = " " * self.parenthetical_margin
         if not parenthetical.startswith("("):
             parenthetical = f"({parenthetical})"
-        return f"{spaces}{parenthetical}\n"
+        return f"{self._parenthetical_pad}{parenthetical}\n"
 
     def format_dialogue_line(self, line: str) -> str:
         """
         Format dialogue (indented from character name).
         """
-        # Simple word wrap for dialogue
-        words = line.split()
-        lines = []
-        current_line = ""
-        max_dialogue_width = 35  # Dialogue is narrower
-
-        for word in words:
-            if len(current_line) + len(word) + 1 <= max_dialogue_width:
-                current_line += word + " "
-            else:
-                lines.append(current_line.strip())
-                current_line = word + " "
-
-        if current_line:
-            lines.append(current_line.strip())
-
-        spaces = " " * self.dialogue_margin
-        return "\n".join([f"{spaces}{line}" for line in lines]) + "\n"
+        if line and len(line) <= self.dialogue_width and line.isprintable() and not line.endswith(" "):
+            return f"{self._dialogue_pad}{line}\n"
+        return "\n".join([f"{self._dialogue_pad}{wrapped}" for wrapped in self._dialogue_wrapper.wrap(line)]) + "\n"
 
     def format_transition(self, transition: str) -> str:
         """
@@ -113,38 +108,40 @@ class ScreenplayFormatter:
         if not transition:
             return ""
 
-        spaces = " " * self.transition_margin
-        return f"\n{spaces}{transition.upper()}\n"
+        return f"\n{self._transition_pad}{uppercase(transition)}\n"
 
     def format_scene(self, scene: Scene) -> str:
         """Format a complete scene."""
-        formatted = ""
+        return "".join(self._format_scene_parts(scene))
 
-        # Scene heading
-        formatted += self.format_scene_heading(scene.heading)
+    def _format_scene_parts(self, scene: Scene) -> List[str]:
+        """Format a scene as a list of fragments, to be joined by the caller."""
+        parts = []
+        append = parts.append
+        character_pad = self._character_pad
+        format_dialogue_line = self.format_dialogue_line
 
-        # Action
-        formatted += self.format_action(scene.action)
+        # Scene already stores heading, speakers and transition uppercased
+        append(f"\n\n{scene.heading}\n\n")
 
-        # Dialogue
-        for dialogue_block in scene.dialogue:
-            character = dialogue_block.get('character', '')
-            parenthetical = dialogue_block.get('parenthetical', '')
-            line = dialogue_block.get('line', '')
+        # Action
+        append(self.format_action(scene.action))
 
-            if character and line:
-                formatted += self.format_character_name(character)
+        # Dialogue (pre-filtered and normalized once per scene)
+        parenthetical_pad = self._parenthetical_pad
+        for character, parenthetical, line in scene.dialogue_blocks:
+            append(f"\n{character_pad}{character}\n")
 
-                if parenthetical:
-                    formatted += self.format_parenthetical(parenthetical)
+            if parenthetical:
+                append(f"{parenthetical_pad}{parenthetical}\n")
 
-                formatted += self.format_dialogue_line(line)
+            append(format_dialogue_line(line))
 
         # Transition
         if scene.transition:
-            formatted += self.format_transition(scene.transition)
+            append(f"\n{self._transition_pad}{scene.transition}\n")
 
-        return formatted
+        return parts
 
     def format_screenplay(
         self,
@@ -155,22 +152,22 @@ class ScreenplayFormatter:
         """
         Format complete screenplay.
         """
-        screenplay = ""
+        parts = []
 
         # Title page
-        screenplay += self.format_title_page(title, author)
+        parts.append(self.format_title_page(title, author))
 
         # Page break
-        screenplay += "\n" + "=" * 60 + "\n\n"
+        parts.append(self._page_break)
 
         # Screenplay content
-        screenplay += "FADE IN:\n"
+        parts.append("FADE IN:\n")
 
         # All scenes
         for scene in scenes:
-            screenplay += self.format_scene(scene)
+            parts.extend(self._format_scene_parts(scene))
 
         # End
-        screenplay += "\n\nFADE OUT.\n\nTHE END"
+        parts.append("\n\nFADE OUT.\n\nTHE END")
 
-        return screenplay
+        return "".join(parts)
@@ -2,12 +2,52 @@
 Character image generation using Gemini 2.5 Flash.
 """
 import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-import urllib.request
-import urllib.error
-import json
-from typing import Optional
-import base64
+import urllib3
+import orjson
+from typing import List, Optional, Tuple, Union
+import binascii
+import hashlib
+import logging
+import shutil
+import tempfile
+from .text import safe_filename
+
+logger = logging.getLogger(__name__)
+
+# Base64 is decoded in slices of this many characters (must be a multiple of 4)
+_B64_CHUNK_CHARS = 64 * 1024
+
+# Fixed tail of every image prompt
+_PROMPT_SUFFIX = ". Professional headshot style, neutral background, high detail, 4K quality, photorealistic."
+
+
+def _write_base64(image_b64: str, path: Path) -> None:
+    """Decode base64 into a file slice by slice, so the decoded image is never held whole."""
+    # Raw descriptor writes: each decoded slice is already large, so Python's buffer only adds a copy
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for start in range(0, len(image_b64), _B64_CHUNK_CHARS):
+            view = memoryview(binascii.a2b_base64(image_b64[start:start + _B64_CHUNK_CHARS]))
+            while view:
+                view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _copy_atomic(source: Path, destination: Path) -> None:
+    """Copy a file via a temp file beside destination, so readers never see a partial copy."""
+    fd, temp_path = tempfile.mkstemp(dir=destination.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
 
 
 class ImageGenerator:
@@ -16,31 +56,113 @@ class ImageGenerator:
     def __init__(self):
         self.output_dir = Path(os.getenv("IMAGES_DIR", "generated_images"))
         self.output_dir.mkdir(exist_ok=True)
+        self.cache_dir = self.output_dir / "cache"
+        self.cache_dir.mkdir(exist_ok=True)
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
         self.model = "gemini-2.5-flash-image"
 
+        # One keep-alive pool shared by all image requests (sized for the batch thread pool).
+        # Rate limits and transient 5xx are retried with exponential backoff (honouring
+        # Retry-After); POST must be allowed explicitly since urllib3 only retries
+        # idempotent methods by default. Read timeouts are not retried (read=0): the
+        # server may have finished that generation, and a re-POST would bill it again
+        self._http = urllib3.PoolManager(
+            maxsize=8,
+            retries=urllib3.Retry(
+                total=3,
+                read=0,
+                backoff_factor=1.0,
+                backoff_max=10.0,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False
+            ),
+            timeout=urllib3.Timeout(connect=10.0, read=30.0)
+        )
+
+        # Base64 decode and disk writes run on one background thread so request
+        # threads can move on to their next API call; each queued image carries a
+        # Future, so callers wait for their own writes only
+        self._write_queue = queue.Queue()
+        threading.Thread(target=self._writer_loop, daemon=True).start()
+
+    def _writer_loop(self):
+        """Decode queued images to disk and copy them into the cache."""
+        while True:
+            image_b64, image_path, cache_path, written = self._write_queue.get()
+            try:
+                _write_base64(image_b64, image_path)
+                _copy_atomic(image_path, cache_path)
+                logger.info("✓ Generated image: %s", image_path)
+                written.set_result(str(image_path))
+            except Exception as e:
+                logger.warning("❌ Error saving image %s: %s", image_path, e)
+                written.set_result(None)
+
+    @staticmethod
+    def _wait_for_writes(results: List[Union[str, Future, None]]) -> List[Optional[str]]:
+        """Block until these queued images are on disk; images whose write failed become None."""
+        return [result.result() if isinstance(result, Future) else result for result in results]
+
     def generate_character_image(
         self,
         character_name: str,
         image_prompt: str,
-        style: str = "cinematic photorealistic"
+        style: str = "cinematic photorealistic",
+        run_id: Optional[str] = None
     ) -> Optional[str]:
         """
         Generate a character reference image using Gemini 2.5 Flash.
 
+        Results are cached on disk by (model, name, prompt, style), so repeat runs
+        of the same character skip the API call.
+
         Args:
             character_name: Name of the character (for filename)
             image_prompt: Detailed visual description
             style: Image style modifier
+            run_id: Prefix for the filename, so concurrent runs with the same
+                character names don't overwrite each other's images
 
         Returns:
             Path to generated image, or None if failed
         """
+        return self._wait_for_writes([self._request_image(character_name, image_prompt, style, run_id)])[0]
+
+    def _request_image(
+        self,
+        character_name: str,
+        image_prompt: str,
+        style: str,
+        run_id: Optional[str] = None
+    ) -> Union[str, Future, None]:
+        """
+        Fetch one image and queue it for writing.
+
+        Returns the path of a cached image, a Future for the path once the new
+        image is written, or None on failure.
+        """
+        safe_name = safe_filename(character_name)
+        if run_id:
+            safe_name = f"{run_id}_{safe_name}"
+
         try:
-            # Enhance prompt with style
-            full_prompt = f"{style} portrait of {image_prompt}. Professional headshot style, neutral background, high detail, 4K quality, photorealistic."
+            # The same model, name, prompt and style already produced an image on a previous run
+            cache_key = hashlib.sha256(
+                f"{self.model}|{character_name}|{image_prompt}|{style}".encode("utf-8")
+            ).hexdigest()
+            for ext in ("png", "jpg"):
+                cached_path = self.cache_dir / f"{cache_key}.{ext}"
+                if cached_path.exists():
+                    image_path = self.output_dir / f"{safe_name}.{ext}"
+                    shutil.copyfile(cached_path, image_path)
+                    logger.info("✓ Reused cached image: %s", image_path)
+                    return str(image_path)
+
+            # Enhance prompt with style (request text built in one pass)
+            request_text = f"Generate an image: {style} portrait of {image_prompt}{_PROMPT_SUFFIX}"
 
-            print(f"🎨 Generating image for {character_name} using Gemini 2.5 Flash...")
+            logger.debug("🎨 Generating image for %s using Gemini 2.5 Flash...", character_name)
 
             # Use Gemini API endpoint for image generation
             gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.google_api_key}"
@@ -50,7 +172,7 @@ class ImageGenerator:
                     {
                         "parts": [
                             {
-                                "text": f"Generate an image: {full_prompt}"
+                                "text": request_text
                             }
                         ]
                     }
@@ -63,33 +185,32 @@ class ImageGenerator:
                 }
             }
 
-            # Use urllib instead of requests to avoid LangSmith tracing recursion issues
-            req = urllib.request.Request(
-                gemini_url,
-                data=json.dumps(payload).encode('utf-8'),
-                headers={"Content-Type": "application/json"}
-            )
-
+            # Use urllib3 directly instead of requests to avoid LangSmith tracing recursion issues;
+            # the shared pool keeps the TLS connection alive between characters
             try:
-                with urllib.request.urlopen(req, timeout=30) as response:
-                    if response.status != 200:
-                        print(f"❌ Error from Gemini API: {response.status}")
-                        return None
-
-                    data = json.loads(response.read().decode('utf-8'))
-            except urllib.error.HTTPError as e:
-                print(f"❌ HTTP Error from Gemini API: {e.code}")
+                response = self._http.request(
+                    "POST",
+                    gemini_url,
+                    body=orjson.dumps(payload),
+                    headers={"Content-Type": "application/json"}
+                )
+            except urllib3.exceptions.HTTPError as e:
+                # MaxRetryError's own message includes the URL (and API key); show only the cause
+                logger.warning("❌ Connection Error: %s", getattr(e, 'reason', None) or type(e).__name__)
                 return None
-            except urllib.error.URLError as e:
-                print(f"❌ Connection Error: {e.reason}")
+
+            if response.status != 200:
+                logger.warning("❌ HTTP Error from Gemini API: %s", response.status)
                 return None
 
+            data = orjson.loads(response.data)
+
             # Process response immediately
             try:
                 candidates = data.get("candidates", [])
 
                 if not candidates:
-                    print(f"⚠️  No candidates in response")
+                    logger.warning("⚠️  No candidates in response")
                     return None
 
                 parts = candidates[0].get("content", {}).get("parts", [])
@@ -102,26 +223,47 @@ class ImageGenerator:
                         image_b64 = inline_data.get("data")
                         mime = inline_data.get("mimeType", "image/png")
 
-                        # Decode and save
-                        img_bytes = base64.b64decode(image_b64)
-
-                        safe_name = character_name.replace(" ", "_").replace(".", "").lower()
                         ext = "png" if "png" in mime else "jpg"
                         image_path = self.output_dir / f"{safe_name}.{ext}"
 
-                        with open(image_path, 'wb') as f:
-                            f.write(img_bytes)
-
-                        print(f"✓ Generated image: {image_path}")
-                        return str(image_path)
+                        # Decode and save on the writer thread
+                        written = Future()
+                        self._write_queue.put((image_b64, image_path, self.cache_dir / f"{cache_key}.{ext}", written))
+                        return written
 
-                print(f"⚠️  No image data in response")
+                logger.warning("⚠️  No image data in response")
                 return None
 
             except Exception as parse_error:
-                print(f"❌ Error parsing response")
+                logger.warning("❌ Error parsing response")
                 return None
 
         except Exception as e:
-            print(f"❌ Error generating image: {str(e)[:100]}")
+            logger.warning("❌ Error generating image: %s", str(e)[:100])
             return None
+
+    def generate_character_images(
+        self,
+        requests: List[Tuple[str, str, str]],
+        run_id: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """
+        Generate several character images concurrently.
+
+        Each request is a blocking HTTPS call that releases the GIL while it
+        waits, so a thread pool overlaps the per-image latency.
+
+        Args:
+            requests: (character_name, image_prompt, style) tuples
+            run_id: Filename prefix shared by every image of this run
+
+        Returns:
+            Image paths (or None for failures) in the same order as requests
+        """
+        if not requests:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(8, len(requests))) as executor:
+            results = list(executor.map(lambda request: self._request_image(*request, run_id), requests))
+
+        return self._wait_for_writes(results)
@@ -5,14 +5,16 @@ Includes episode numbers and scene numbers on margins.
 """
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, PageTemplate, Frame
-from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from pathlib import Path
 from typing import List, Optional
 from ..state import Character, Scene
+from .text import safe_filename, uppercase
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class ScreenplayPDFExporter:
     """Export screenplay to professional PDF - just formats data, no calculation logic."""
@@ -28,8 +30,22 @@ class ScreenplayPDFExporter:
         self.top_margin = 1.0 * inch
         self.bottom_margin = 1.0 * inch
 
+        # Paragraph styles are built on first use and shared by every page
+        self._styles = None
+
+        # PageBreak carries no layout state, so one instance serves every break.
+        # Spacers are not shared: ReportLab marks a flowable pushed to the next
+        # page as postponed and rejects the same instance the second time.
+        self._page_break = None
+
+    # reportlab.lib.styles and reportlab.platypus are imported inside the methods
+    # that use them: they take most of ReportLab's import time and runs that
+    # never export a PDF don't need them
+
     def create_styles(self):
         """Create custom paragraph styles for screenplay elements."""
+        from reportlab.lib.styles import ParagraphStyle
+
         styles = {}
 
         # Title page
@@ -130,16 +146,31 @@ class ScreenplayPDFExporter:
 
         return styles
 
+    def _get_styles(self):
+        """Return the shared paragraph styles, building them once."""
+        if self._styles is None:
+            self._styles = self.create_styles()
+        return self._styles
+
+    def _get_page_break(self):
+        """Return the shared PageBreak, creating it once."""
+        if self._page_break is None:
+            from reportlab.platypus import PageBreak
+            self._page_break = PageBreak()
+        return self._page_break
+
     def create_title_page(self, title: str, author: str) -> List:
         """Create title page elements."""
-        styles = self.create_styles()
+        from reportlab.platypus import Paragraph, Spacer
+
+        styles = self._get_styles()
         story = []
 
         # Add spacing to center on page
         story.append(Spacer(1, 2.5 * inch))
 
         # Title
-        story.append(Paragraph(title.upper(), styles['Title']))
+        story.append(Paragraph(uppercase(title), styles['Title']))
         story.append(Spacer(1, 0.3 * inch))
 
         # Written by
@@ -150,18 +181,21 @@ class ScreenplayPDFExporter:
         story.append(Paragraph(author, styles['Author']))
 
         # Page break
-        story.append(PageBreak())
+        story.append(self._get_page_break())
 
         return story
 
     def create_character_pages(self, characters: List[Character]) -> List:
         """Create character reference pages with images and descriptions."""
-        styles = self.create_styles()
+        from reportlab.platypus import Paragraph, Spacer, Image
+
+        styles = self._get_styles()
+        page_break = self._get_page_break()
         story = []
 
         story.append(Paragraph("CHARACTER REFERENCE", styles['Title']))
         story.append(Spacer(1, 0.3 * inch))
-        story.append(PageBreak())
+        story.append(page_break)
 
         for character in characters:
             # Character name
@@ -175,7 +209,7 @@ class ScreenplayPDFExporter:
                     story.append(img)
                     story.append(Spacer(1, 0.2 * inch))
                 except Exception as e:
-                    print(f"Could not load image for {character.name}: {e}")
+                    logger.warning("Could not load image for %s: %s", character.name, e)
 
             # Character details
             if character.age:
@@ -195,18 +229,24 @@ class ScreenplayPDFExporter:
                 story.append(Paragraph(character.arc, styles['CharacterInfo']))
 
             # Page break between characters
-            story.append(PageBreak())
+            story.append(page_break)
 
         return story
 
     def create_screenplay_pages(self, scenes: List[Scene]) -> List:
         """Create formatted screenplay pages with scene numbers and episode markers."""
-        styles = self.create_styles()
+        from reportlab.platypus import Paragraph, Spacer
+
+        styles = self._get_styles()
+        character_style = styles['Character']
+        parenthetical_style = styles['Parenthetical']
+        dialogue_style = styles['Dialogue']
         story = []
+        append = story.append
 
         # FADE IN
-        story.append(Paragraph("FADE IN:", styles['SceneHeading']))
-        story.append(Spacer(1, 0.2 * inch))
+        append(Paragraph("FADE IN:", styles['SceneHeading']))
+        append(Spacer(1, 0.2 * inch))
 
         # Track current episode to insert episode markers
         current_episode = None
@@ -216,51 +256,44 @@ class ScreenplayPDFExporter:
             # Add episode marker when episode changes
             if scene.episode_number != current_episode:
                 current_episode = scene.episode_number
-                story.append(Spacer(1, 0.3 * inch))
-                story.append(Paragraph(f"<b>EPISODE {current_episode}</b>", styles['SceneHeading']))
-                story.append(Spacer(1, 0.3 * inch))
+                append(Spacer(1, 0.3 * inch))
+                append(Paragraph(f"<b>EPISODE {current_episode}</b>", styles['SceneHeading']))
+                append(Spacer(1, 0.3 * inch))
 
             # Scene heading with scene number on both margins
             # We'll add the scene number prefix to the heading
             scene_num = str(scene.scene_number)
-            heading_with_number = f"{scene_num}    {scene.heading.upper()}"
+            heading_with_number = f"{scene_num}    {scene.heading}"
 
-            story.append(Paragraph(heading_with_number, styles['SceneHeading']))
+            append(Paragraph(heading_with_number, styles['SceneHeading']))
 
             # Action
-            story.append(Paragraph(scene.action, styles['Action']))
-            story.append(Spacer(1, 0.1 * inch))
-
-            # Dialogue
-            for dialogue_block in scene.dialogue:
-                character = dialogue_block.get('character', '')
-                parenthetical = dialogue_block.get('parenthetical', '')
-                line = dialogue_block.get('line', '')
+            append(Paragraph(scene.action, styles['Action']))
+            append(Spacer(1, 0.1 * inch))
 
-                if character and line:
-                    # Character name
-                    story.append(Paragraph(character.upper(), styles['Character']))
+            # Dialogue (pre-filtered and normalized once per scene)
+            for character, parenthetical, line in scene.dialogue_blocks:
+                # Character name
+                append(Paragraph(character, character_style))
 
-                    # Parenthetical
-                    if parenthetical:
-                        if not parenthetical.startswith('('):
-                            parenthetical = f"({parenthetical})"
-                        story.append(Paragraph(parenthetical, styles['Parenthetical']))
+                # Parenthetical
+                if parenthetical:
+                    append(Paragraph(parenthetical, parenthetical_style))
 
-                    # Dialogue
-                    story.append(Paragraph(line, styles['Dialogue']))
+                # Dialogue
+                append(Paragraph(line, dialogue_style))
 
             # Transition
             if scene.transition:
-                story.append(Paragraph(scene.transition.upper(), styles['Transition']))
+                append(Paragraph(scene.transition, styles['Transition']))
 
-            story.append(Spacer(1, 0.2 * inch))
+            append(Spacer(1, 0.2 * inch))
 
         # FADE OUT
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph("FADE OUT.", styles['Transition']))
-        story.append(Spacer(1, 0.3 * inch))
-        story.append(Paragraph("THE END", styles['Character']))
+        append(Spacer(1, 0.2 * inch))
+        append(Paragraph("FADE OUT.", styles['Transition']))
+        append(Spacer(1, 0.3 * inch))
+        append(Paragraph("THE END", styles['Character']))
 
         return story
 
@@ -270,23 +303,30 @@ class ScreenplayPDFExporter:
         author: str,
         characters: List[Character],
         scenes: List[Scene],
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        run_id: Optional[str] = None
     ) -> str:
         """
         Export complete screenplay to PDF with episode number and scene numbers.
 
+        The default filename comes from the title; run_id prefixes it, so
+        concurrent runs with the same title don't write to the same file.
+
         Returns:
             Path to generated PDF
         """
+        from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame
+
         # Generate filename
         if not filename:
-            safe_title = title.replace(" ", "_").replace(".", "").lower()
-            filename = f"{safe_title}_screenplay.pdf"
+            filename = f"{safe_filename(title)}_screenplay.pdf"
+            if run_id:
+                filename = f"{run_id}_{filename}"
 
         output_path = self.output_dir / filename
 
-        # Create PDF document
-        doc = SimpleDocTemplate(
+        # Create PDF document: one frame inside the margins on every page
+        doc = BaseDocTemplate(
             str(output_path),
             pagesize=letter,
             leftMargin=self.left_margin,
@@ -294,6 +334,8 @@ class ScreenplayPDFExporter:
             topMargin=self.top_margin,
             bottomMargin=self.bottom_margin
         )
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+        doc.addPageTemplates([PageTemplate(id='screenplay', frames=[frame])])
 
         # Build story
         story = []
@@ -311,5 +353,5 @@ class ScreenplayPDFExporter:
         # Build PDF
         doc.build(story)
 
-        print(f"✓ PDF exported: {output_path}")
+        logger.info("✓ PDF exported: %s", output_path)
         return str(output_path)
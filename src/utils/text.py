@@ -0,0 +1,16 @@
+"""
+Small text helpers shared by the state models, exporters and image generator.
+"""
+
+# Filename sanitizer: spaces become underscores, dots are dropped
+_SAFE_NAME_TABLE = str.maketrans({" ": "_", ".": None})
+
+
+def uppercase(text: str) -> str:
+    """Uppercase text, skipping the copy when the model already wrote it in caps."""
+    return text if text.isupper() else text.upper()
+
+
+def safe_filename(name: str) -> str:
+    """Lowercase filename stem for a title or character name."""
+    return name.translate(_SAFE_NAME_TABLE).lower()
@@ -0,0 +1,99 @@
+"""
+Screenplay workflow: programmatic entry point for generating screenplays.
+Wraps the LangGraph graph defined in agent.py.
+"""
+import asyncio
+import copy
+import time
+from typing import Dict, List, Optional, Union
+
+from .agent import checkpointed, compile_workflow, resume_or_start
+
+
+class ScreenplayWorkflow:
+    """Generate a complete screenplay (text + PDF) from a story idea."""
+
+    def __init__(self, checkpoint_db: Optional[str] = None):
+        """
+        Args:
+            checkpoint_db: SQLite file that records progress after every node, so a
+                failed run of the same idea resumes where it stopped
+                (defaults to CHECKPOINT_DB)
+        """
+        self.checkpoint_db = checkpoint_db
+
+        # Compiled once; every run shares it (state flows through each call)
+        self.app = compile_workflow()
+
+    async def agenerate_screenplay(self, idea: str) -> Dict:
+        """
+        Generate a screenplay on the running event loop.
+
+        The agent nodes are async, so their LLM calls (and the image branch)
+        overlap on one loop instead of each blocking a thread.
+
+        Returns:
+            Final workflow state (title, scenes, pdf_path, ...)
+        """
+        async with checkpointed(self.app, self.checkpoint_db) as app:
+            return await self._generate_one(app, idea)
+
+    def generate_screenplay(self, idea: str) -> Dict:
+        """Generate a screenplay from synchronous code."""
+        return asyncio.run(self.agenerate_screenplay(idea))
+
+    async def generate_screenplays_batch(
+        self,
+        ideas: List[str],
+        max_concurrency: int = 4
+    ) -> List[Union[Dict, BaseException]]:
+        """
+        Generate screenplays for several ideas concurrently.
+
+        At most max_concurrency ideas run at once, which also bounds the load on
+        the LLM and image APIs. Each idea is its own checkpoint thread, so one
+        failure doesn't stop the rest and re-running the batch resumes it.
+
+        Returns:
+            Final state per idea, in input order; a failed idea's entry is the
+            exception it raised
+
+        Raises:
+            ValueError: If max_concurrency is less than 1
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async with checkpointed(self.app, self.checkpoint_db) as app:
+            async def generate(idea: str) -> Dict:
+                async with semaphore:
+                    return await self._generate_one(app, idea)
+
+            # Duplicate ideas would share a checkpoint thread, so each runs once
+            unique_ideas = list(dict.fromkeys(ideas))
+            results = await asyncio.gather(
+                *(generate(idea) for idea in unique_ideas),
+                return_exceptions=True
+            )
+
+        # Repeated ideas get their own copy, so editing one result leaves the others alone
+        by_idea = dict(zip(unique_ideas, results))
+        seen = set()
+        batch = []
+        for idea in ideas:
+            result = by_idea[idea]
+            if idea in seen and isinstance(result, dict):
+                result = copy.deepcopy(result)
+            seen.add(idea)
+            batch.append(result)
+        return batch
+
+    @staticmethod
+    async def _generate_one(app, idea: str) -> Dict:
+        """Run one idea on a checkpointed graph and record how long it took."""
+        start_time = time.time()
+        final_state = await resume_or_start(app, idea)
+        final_state["generation_time"] = time.time() - start_time
+        return final_state
@@ -0,0 +1,172 @@
+"""
+Offline tests for the dialogue agent's all-scenes request and per-scene fallback.
+"""
+import asyncio
+import re
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.agents import dialogue_agent
+from src.agents.dialogue_agent import (
+    ALL_SCENES_MAX_OUTPUT_TOKENS,
+    AllDialogue,
+    DialogueList,
+    create_dialogue_agent,
+)
+from src.state import Character, Scene
+
+
+def _reply(parsed, output_tokens=100, parsing_error=None):
+    """A structured-output result as returned with include_raw=True."""
+    raw = AIMessage(content="", response_metadata={"usage": {"output_tokens": output_tokens}})
+    return {"raw": raw, "parsed": parsed, "parsing_error": parsing_error}
+
+
+def _all_scenes(*scene_numbers):
+    return AllDialogue(scenes=[
+        {"scene_number": number, "dialogue": [{"character": "ada", "line": f"All-scenes line {number}"}]}
+        for number in scene_numbers
+    ])
+
+
+def _one_scene(number):
+    return DialogueList(dialogue=[{"character": "ada", "line": f"Per-scene line {number}"}])
+
+
+def _stub_llms(monkeypatch, all_scenes_reply, scene_reply=lambda number: _reply(_one_scene(number))):
+    """
+    Stub both dialogue clients; returns the scene numbers sent per scene.
+
+    all_scenes_reply is the all-scenes result (an exception is raised) and
+    scene_reply maps a scene number to its per-scene result.
+    """
+    per_scene_calls = []
+
+    async def all_scenes(messages):
+        if isinstance(all_scenes_reply, Exception):
+            raise all_scenes_reply
+        return all_scenes_reply
+
+    async def one_scene(messages):
+        number = int(re.search(r"Scene #(\d+)", messages[-1].content).group(1))
+        per_scene_calls.append(number)
+        result = scene_reply(number)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    all_scenes_llm = RunnableLambda(lambda messages: None, afunc=all_scenes)
+    scene_llm = RunnableLambda(lambda messages: None, afunc=one_scene)
+    monkeypatch.setattr(dialogue_agent, "_get_all_scenes_structured_llm", lambda: all_scenes_llm)
+    monkeypatch.setattr(dialogue_agent, "_get_structured_llm", lambda max_output_tokens: scene_llm)
+    return per_scene_calls
+
+
+def _state(scene_count=3):
+    return {
+        "genre": "Drama",
+        "tone": "Quiet",
+        "characters": [Character(name="ADA", description="An engineer", role="protagonist")],
+        "scenes": [
+            Scene(
+                scene_number=number,
+                heading="int. lab - night",
+                action="Ada works late.",
+                dialogue=[{"character": "ADA", "line": f"Draft line {number}"}]
+            )
+            for number in range(1, scene_count + 1)
+        ],
+    }
+
+
+def _lines(result):
+    return [scene.dialogue[0]["line"] for scene in result["scenes"]]
+
+
+def test_all_scenes_reply_is_used_without_fallback(monkeypatch):
+    per_scene_calls = _stub_llms(monkeypatch, _reply(_all_scenes(1, 2, 3)))
+
+    result = asyncio.run(create_dialogue_agent(_state()))
+
+    assert per_scene_calls == []
+    assert _lines(result) == ["All-scenes line 1", "All-scenes line 2", "All-scenes line 3"]
+
+
+def test_reply_at_token_cap_falls_back_per_scene(monkeypatch):
+    # A response that hit the cap may be truncated, even if it parsed
+    reply = _reply(_all_scenes(1, 2, 3), output_tokens=ALL_SCENES_MAX_OUTPUT_TOKENS)
+    per_scene_calls = _stub_llms(monkeypatch, reply)
+
+    result = asyncio.run(create_dialogue_agent(_state()))
+
+    assert sorted(per_scene_calls) == [1, 2, 3]
+    assert _lines(result) == ["Per-scene line 1", "Per-scene line 2", "Per-scene line 3"]
+
+
+@pytest.mark.parametrize("all_scenes_reply", [
+    _reply(None, parsing_error=ValueError("bad json")),
+    RuntimeError("overloaded"),
+])
+def test_failed_all_scenes_request_falls_back_per_scene(monkeypatch, all_scenes_reply):
+    per_scene_calls = _stub_llms(monkeypatch, all_scenes_reply)
+
+    result = asyncio.run(create_dialogue_agent(_state()))
+
+    assert sorted(per_scene_calls) == [1, 2, 3]
+    assert _lines(result) == ["Per-scene line 1", "Per-scene line 2", "Per-scene line 3"]
+
+
+def test_only_missing_scene_numbers_are_requested_again(monkeypatch):
+    per_scene_calls = _stub_llms(monkeypatch, _reply(_all_scenes(1, 3)))
+
+    result = asyncio.run(create_dialogue_agent(_state()))
+
+    assert per_scene_calls == [2]
+    assert _lines(result) == ["All-scenes line 1", "Per-scene line 2", "All-scenes line 3"]
+
+
+_FAILING_SCENE_REPLIES = [
+    lambda number: RuntimeError("overloaded") if number == 2 else _reply(_one_scene(number)),
+    lambda number: _reply(None, parsing_error=ValueError("bad json")) if number == 2 else _reply(_one_scene(number)),
+]
+
+
+@pytest.mark.parametrize("scene_reply", _FAILING_SCENE_REPLIES)
+def test_failed_scene_keeps_original_dialogue(monkeypatch, scene_reply):
+    _stub_llms(monkeypatch, RuntimeError("overloaded"), scene_reply)
+
+    result = asyncio.run(create_dialogue_agent(_state()))
+
+    assert _lines(result) == ["Per-scene line 1", "Draft line 2", "Per-scene line 3"]
+
+
+@pytest.mark.parametrize("scene_reply", _FAILING_SCENE_REPLIES)
+def test_failed_scene_raises_when_asked(monkeypatch, scene_reply):
+    # With a node cache the half-written result must not be stored
+    _stub_llms(monkeypatch, RuntimeError("overloaded"), scene_reply)
+    state = _state()
+
+    with pytest.raises(RuntimeError, match=r"scene\(s\) \[2\]"):
+        asyncio.run(create_dialogue_agent(state, raise_on_error=True))
+
+    assert _lines(state) == ["Draft line 1", "Draft line 2", "Draft line 3"]
+
+
+def test_scene_cast_matches_mixed_case_character_names(monkeypatch):
+    """Scene uppercases speakers, so "Ada" in the character list must still match "ADA"."""
+    prompts = []
+
+    async def all_scenes(messages):
+        prompts.append(messages[-1].content)
+        return _reply(_all_scenes(1))
+
+    all_scenes_llm = RunnableLambda(lambda messages: None, afunc=all_scenes)
+    monkeypatch.setattr(dialogue_agent, "_get_all_scenes_structured_llm", lambda: all_scenes_llm)
+    state = _state(scene_count=1)
+    state["characters"] = [Character(name="Ada", description="An engineer", role="protagonist")]
+
+    asyncio.run(create_dialogue_agent(state))
+
+    assert "Characters in this scene: Ada\n" in prompts[0]
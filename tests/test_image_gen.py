@@ -1,11 +1,8 @@
 """
 Test script for Gemini 2.5 Flash image generation.
 """
+# Importing the src package loads .env
 from src.utils.image_generator import ImageGenerator
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 def test_image_generation():
     """Test image generation with mock character descriptions."""
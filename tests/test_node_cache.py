@@ -0,0 +1,97 @@
+"""
+Offline tests for the LLM node cache (no API calls).
+"""
+import asyncio
+import functools
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.cache.memory import InMemoryCache
+from langgraph.graph import StateGraph, END
+
+from src.agent import cache_on
+from src.agents import logline_agent
+from src.agents.logline_agent import LoglineSchema, create_logline_agent
+from src.state import Character, ScreenplayState
+
+
+def _stub_llm(monkeypatch, replies):
+    """Serve logline replies in order (exceptions are raised); returns the recorded calls."""
+    calls = []
+
+    async def reply(messages):
+        calls.append(messages)
+        result = replies[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    stub = RunnableLambda(lambda messages: None, afunc=reply)
+    monkeypatch.setattr(logline_agent, "_get_structured_llm", lambda max_output_tokens: stub)
+    return calls
+
+
+def _logline_graph():
+    graph = StateGraph(ScreenplayState)
+    # As build_workflow() wires the agents when a node cache is configured
+    agent = functools.partial(create_logline_agent, raise_on_error=True)
+    graph.add_node("logline_agent", agent, cache_policy=cache_on("idea"))
+    graph.set_entry_point("logline_agent")
+    graph.add_edge("logline_agent", END)
+    return graph.compile(cache=InMemoryCache())
+
+
+def test_failed_node_is_not_replayed(monkeypatch):
+    """A node that failed calls the model again on retry; a success is then cached."""
+    logline = LoglineSchema(title="The Vault", logline="A thief cracks one last safe.", genre="Thriller", tone="Tense")
+    calls = _stub_llm(monkeypatch, [RuntimeError("overloaded"), logline])
+    app = _logline_graph()
+
+    try:
+        asyncio.run(app.ainvoke({"idea": "heist"}))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("the failed model call should fail the node")
+
+    retried = asyncio.run(app.ainvoke({"idea": "heist"}))
+    cached = asyncio.run(app.ainvoke({"idea": "heist"}))
+
+    assert len(calls) == 2
+    assert retried["title"] == cached["title"] == "The Vault"
+
+
+def test_failed_request_falls_back_without_a_cache(monkeypatch):
+    """Without raise_on_error a failed request still yields the placeholder logline."""
+    _stub_llm(monkeypatch, [RuntimeError("overloaded")])
+
+    result = asyncio.run(create_logline_agent({"idea": "heist"}))
+
+    assert result["title"] == "Untitled"
+
+
+
+def test_cache_key_covers_only_the_listed_fields():
+    key = cache_on("logline", "genre").key_func
+    state = {"logline": "A thief cracks one last safe.", "genre": "Thriller", "outline": "Act one"}
+
+    assert key(state) == key({**state, "outline": "Act two", "title": "The Vault"})
+    assert key(state) != key({**state, "genre": "Comedy"})
+
+
+def test_cache_key_ignores_image_paths():
+    """Image paths are filled in alongside the scene branch, so they must not change its key."""
+    key = cache_on("characters").key_func
+    ada = Character(name="ADA", description="An engineer", role="protagonist")
+
+    assert key({"characters": [ada]}) == key({"characters": [ada.model_copy(update={"image_path": "ada.png"})]})
+    assert key({"characters": [ada]}) != key({"characters": [ada.model_copy(update={"role": "antagonist"})]})
+
+
+def test_cache_key_changes_with_model_and_settings(monkeypatch):
+    state = {"idea": "heist"}
+    key = cache_on("idea", settings={"prompt_version": 1}).key_func(state)
+
+    assert key != cache_on("idea", settings={"prompt_version": 2}).key_func(state)
+
+    monkeypatch.setenv("SCREENPLAY_MODEL", "claude-other")
+    assert key != cache_on("idea", settings={"prompt_version": 1}).key_func(state)
@@ -0,0 +1,56 @@
+"""
+Tests for Scene normalization and dialogue_blocks.
+"""
+from src.state import Scene
+
+
+def _scene(**fields):
+    values = {
+        "scene_number": 1,
+        "heading": "int. lab - night",
+        "action": "Ada works late.",
+        "dialogue": [],
+    }
+    values.update(fields)
+    return Scene(**values)
+
+
+def test_heading_and_transition_are_uppercased():
+    scene = _scene(transition="cut to:")
+
+    assert scene.heading == "INT. LAB - NIGHT"
+    assert scene.transition == "CUT TO:"
+    assert _scene().transition is None
+
+
+def test_speakers_are_uppercased_on_creation_and_assignment():
+    scene = _scene(dialogue=[{"character": "ada", "line": "Again."}])
+    assert scene.dialogue[0]["character"] == "ADA"
+
+    scene.dialogue = [{"character": "Ben", "line": "Go home."}]
+    assert scene.dialogue[0]["character"] == "BEN"
+
+
+
+def test_dialogue_blocks_skip_empty_and_wrap_parentheticals():
+    scene = _scene(dialogue=[
+        {"character": "ADA", "line": "Again.", "parenthetical": "sighing"},
+        {"character": "BEN", "line": "Go home.", "parenthetical": "(gently)"},
+        {"character": "ADA", "line": ""},
+        {"line": "Nobody said this."},
+    ])
+
+    assert scene.dialogue_blocks == [
+        ("ADA", "(sighing)", "Again."),
+        ("BEN", "(gently)", "Go home."),
+    ]
+
+
+def test_dialogue_blocks_follow_in_place_edits():
+    scene = _scene(dialogue=[{"character": "ada", "line": "Again."}])
+    assert scene.dialogue_blocks == [("ADA", None, "Again.")]
+
+    scene.dialogue[0]["line"] = "Once more."
+    scene.dialogue.append({"character": "ben", "line": "Go home."})
+
+    assert scene.dialogue_blocks == [("ADA", None, "Once more."), ("BEN", None, "Go home.")]